@@ -0,0 +1,262 @@
+"""Offline bulk generation for OmniStudy.
+
+Reads a syllabus file and generates a quiz, a flashcard deck and a summary for
+every topic, streaming results to a JSONL file. The output file doubles as the
+checkpoint: re-running the same command skips every (topic, kind) pair that is
+already in it, so a crash or a quota stop resumes where it left off.
+
+Syllabus formats:
+  .txt    one topic per line, blank lines and lines starting with # ignored
+  .json   array of topic strings or {"topic": ..., "text": ...} objects
+  .jsonl  one topic string or {"topic": ..., "text": ...} object per line
+
+"text" is optional source material for the summary; the topic itself is
+summarized when it is missing.
+
+Usage:
+  python batch_generate.py syllabus.txt -o course.jsonl --workers 4 --rpm 30
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Set, Tuple
+
+from services import ai_service
+from services.ai_service import AIUnavailable, generate_flashcards, generate_quiz, summarize_text
+
+KINDS = ["quiz", "flashcards", "summary"]
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_QUOTA = 2
+EXIT_CONFIG = 3
+
+
+class QuotaExhausted(Exception):
+    """Raised when the provider keeps refusing requests for quota reasons."""
+
+
+class RateLimiter:
+    """Spaces out request starts across all worker threads."""
+
+    def __init__(self, requests_per_minute: float):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def penalize(self, seconds: float):
+        """Push every worker's next slot back after the provider returned 429."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+def load_syllabus(path: str) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+
+    if path.endswith(".json"):
+        entries = json.loads(raw)
+    elif path.endswith(".jsonl"):
+        entries = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    else:
+        entries = [
+            line.strip() for line in raw.splitlines()
+            if line.strip() and not line.strip().startswith("#")
+        ]
+
+    topics = []
+    seen = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            entry = {"topic": entry}
+        topic = str(entry.get("topic", "")).strip()
+        if not topic or topic in seen:
+            continue
+        seen.add(topic)
+        topics.append({"topic": topic, "text": str(entry.get("text") or "")})
+    return topics
+
+
+def load_checkpoint(path: str) -> Set[Tuple[str, str]]:
+    """Return the (topic, kind) pairs already written to the output file.
+
+    A line cut short by a crash (or anything that is not a JSON object) ends
+    the checkpoint; the file is truncated back to the last complete record so
+    that appending stays valid JSONL.
+    """
+    done = set()
+    if not os.path.exists(path):
+        return done
+
+    valid_end = 0
+    with open(path, "rb") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                break
+            if not isinstance(record, dict) or not line.endswith(b"\n"):
+                break
+            valid_end += len(line)
+            done.add((record.get("topic"), record.get("kind")))
+
+    if valid_end != os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(valid_end)
+    return done
+
+
+def run_job(item: Dict[str, str], kind: str, args, limiter: RateLimiter, stop: threading.Event) -> Any:
+    """Generate one item.
+
+    Raises QuotaExhausted when the providers keep rate-limiting it, and
+    AIUnavailable (non-quota) or ValueError (unparseable reply) for failures
+    that a rerun would not fix by waiting. Each attempt is a single pass over
+    the fallback models (retries=1), so this loop's backoff is the only one.
+    """
+    topic = item["topic"]
+    for attempt in range(args.retries):
+        if stop.is_set():
+            return None
+        limiter.wait()
+        try:
+            if kind == "quiz":
+                return generate_quiz(topic, args.questions, args.difficulty, strict=True, retries=1)
+            if kind == "flashcards":
+                return generate_flashcards(topic, args.cards, strict=True, retries=1)
+            return summarize_text(item["text"] or topic, args.length, strict=True, retries=1)
+        except AIUnavailable as e:
+            if not e.quota_limited:
+                raise
+            err = e
+        if attempt < args.retries - 1:
+            # Transient rate limit: back off for everyone, then retry.
+            wait = (attempt + 1) * args.backoff
+            limiter.penalize(wait)
+            time.sleep(wait)
+
+    raise QuotaExhausted(str(err))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate quizzes, flashcards and summaries for every topic in a syllabus."
+    )
+    parser.add_argument("syllabus", help="Syllabus file (.txt, .json or .jsonl)")
+    parser.add_argument("-o", "--output", default="omnistudy_batch.jsonl",
+                        help="JSONL output file, also used as the resume checkpoint")
+    parser.add_argument("--kinds", default=",".join(KINDS),
+                        help="Comma-separated subset of: " + ", ".join(KINDS))
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--rpm", type=float, default=30,
+                        help="Max items started per minute across all workers (0 = unlimited); "
+                             "an item tries each fallback model once")
+    parser.add_argument("--retries", type=int, default=3, help="Attempts per item on rate-limit errors")
+    parser.add_argument("--backoff", type=float, default=10, help="Base backoff in seconds after a 429")
+    parser.add_argument("--questions", type=int, default=5, help="Questions per quiz")
+    parser.add_argument("--difficulty", default="Medium", choices=["Easy", "Medium", "Hard"])
+    parser.add_argument("--cards", type=int, default=10, help="Cards per flashcard deck")
+    parser.add_argument("--length", default="Medium", choices=["Brief", "Medium", "Detailed"])
+    args = parser.parse_args(argv)
+
+    kinds = [k.strip() for k in args.kinds.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in KINDS]
+    if unknown:
+        parser.error(f"unknown kind(s): {', '.join(unknown)}")
+    args.kinds = kinds
+    args.workers = max(1, args.workers)
+    args.retries = max(1, args.retries)
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    topics = load_syllabus(args.syllabus)
+    done = load_checkpoint(args.output)
+    jobs = [(item, kind) for item in topics for kind in args.kinds if (item["topic"], kind) not in done]
+
+    total = len(topics) * len(args.kinds)
+    print(f"{len(topics)} topics, {total} items, {total - len(jobs)} already done, {len(jobs)} to generate.")
+    if not jobs:
+        return EXIT_OK
+    if ai_service.groq_client is None and ai_service.gemini_client is None:
+        for error in ai_service.INIT_ERRORS:
+            print(error, file=sys.stderr)
+        print("No AI provider configured. Set GROQ_API_KEY or GEMINI_API_KEY.", file=sys.stderr)
+        return EXIT_CONFIG
+
+    limiter = RateLimiter(args.rpm)
+    stop = threading.Event()
+    completed = 0
+    failures = []
+    quota_error = None
+    config_error = None
+
+    with open(args.output, "a", encoding="utf-8") as out, ThreadPoolExecutor(max_workers=args.workers) as pool:
+        futures = {pool.submit(run_job, item, kind, args, limiter, stop): (item, kind) for item, kind in jobs}
+        try:
+            for future in as_completed(futures):
+                item, kind = futures[future]
+                try:
+                    result = future.result()
+                except QuotaExhausted as e:
+                    # Stop handing out new work; finished items stay checkpointed.
+                    quota_error = quota_error or str(e)
+                    stop.set()
+                    continue
+                except AIUnavailable as e:
+                    if not e.config_error:
+                        failures.append(f"{item['topic']} [{kind}]: {e}")
+                        continue
+                    # Bad key or model: every remaining item would fail the same way.
+                    config_error = config_error or str(e)
+                    stop.set()
+                    continue
+                except Exception as e:
+                    failures.append(f"{item['topic']} [{kind}]: {e}")
+                    continue
+                if result is None:
+                    continue
+
+                record = {"topic": item["topic"], "kind": kind, "result": result, "generated_at": time.time()}
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                os.fsync(out.fileno())
+                completed += 1
+                print(f"[{completed}/{len(jobs)}] {item['topic']} [{kind}]")
+        except KeyboardInterrupt:
+            stop.set()
+            for future in futures:
+                future.cancel()
+            print("Interrupted; progress saved. Re-run the same command to resume.", file=sys.stderr)
+            raise
+
+    for failure in failures:
+        print(f"Failed: {failure}", file=sys.stderr)
+    if config_error:
+        print(f"Stopped on configuration error: {config_error}", file=sys.stderr)
+        return EXIT_CONFIG
+    if quota_error:
+        print(f"Stopped on quota: {quota_error}", file=sys.stderr)
+        print("Progress saved. Re-run the same command to resume.", file=sys.stderr)
+        return EXIT_QUOTA
+    return EXIT_FAILURES if failures else EXIT_OK
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1 @@
+# Lets tests import top-level modules (batch_generate, services.*) from the repo root.
@@ -0,0 +1,304 @@
+"""AI generation helpers shared by the Streamlit app and batch_generate.py.
+
+Groq is the primary provider and Gemini the fallback. Keys and model lists are
+read from Streamlit secrets when available, otherwise from the environment.
+"""
+import importlib
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import streamlit as st
+except ImportError:
+    st = None
+
+try:
+    from google import genai
+except ImportError:
+    genai = None
+
+
+def _setting(name: str, default: str = "") -> str:
+    if st is not None:
+        try:
+            value = st.secrets.get(name, "")
+            if value:
+                return value
+        except Exception:
+            pass
+    return os.getenv(name, default)
+
+
+def _model_list(name: str, defaults: List[str]) -> List[str]:
+    raw = _setting(name)
+    return [m.strip() for m in raw.split(",") if m.strip()] if raw else defaults
+
+
+GEMINI_API_KEY = _setting("GEMINI_API_KEY")
+GROQ_API_KEY = _setting("GROQ_API_KEY")
+
+# Override from secrets/env with GEMINI_MODELS="model-a,model-b" (same for GROQ_MODELS)
+MODEL_CANDIDATES = _model_list("GEMINI_MODELS", [
+    "gemini-1.5-flash",
+    "gemini-1.5-flash-8b",
+    "gemini-2.0-flash"
+])
+AI_MODEL = MODEL_CANDIDATES[0]
+
+GROQ_MODEL_CANDIDATES = _model_list("GROQ_MODELS", [
+    "llama-3.3-70b-versatile",
+    "llama-3.1-8b-instant"
+])
+
+# Messages for the app to surface; the service itself never touches the UI.
+INIT_ERRORS: List[str] = []
+
+# ─── Initialize Gemini Client ───
+gemini_client = None
+if GEMINI_API_KEY:
+    if genai is None:
+        INIT_ERRORS.append("Gemini SDK not installed. Add 'google-genai' to requirements.txt.")
+    else:
+        try:
+            gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+        except Exception as e:
+            INIT_ERRORS.append(f"Failed to initialize Gemini: {str(e)}")
+
+# ─── Initialize Groq Client ───
+groq_client = None
+Groq = None
+try:
+    Groq = getattr(importlib.import_module("groq"), "Groq")
+except Exception:
+    Groq = None
+
+if GROQ_API_KEY and Groq is not None:
+    try:
+        groq_client = Groq(api_key=GROQ_API_KEY)
+    except Exception as e:
+        INIT_ERRORS.append(f"Failed to initialize Groq: {str(e)}")
+elif GROQ_API_KEY and Groq is None:
+    INIT_ERRORS.append("Groq SDK not installed. Add 'groq' to requirements.txt.")
+
+
+# Model errors that no retry or other prompt will fix.
+_CONFIG_ERROR_MARKERS = (
+    "401", "403", "404", "unauthenticated", "permission_denied", "not_found",
+    "invalid api key", "invalid_api_key", "api_key_invalid",
+)
+
+
+class AIUnavailable(Exception):
+    """Every configured provider/model failed for a prompt."""
+
+    def __init__(self, message: str, errors: Optional[List[str]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+    @property
+    def quota_limited(self) -> bool:
+        """True if any model was refused for rate-limit/quota reasons, so a later retry can succeed."""
+        return any("429" in e or "resource_exhausted" in e.lower() for e in self.errors)
+
+    @property
+    def config_error(self) -> bool:
+        """True if no provider is usable at all (none configured, bad key, unknown model)."""
+        return all(
+            any(marker in e.lower() for marker in _CONFIG_ERROR_MARKERS) for e in self.errors
+        ) and not self.quota_limited
+
+
+_model_listener: Optional[Callable[[str, str], None]] = None
+
+
+def set_model_listener(callback: Optional[Callable[[str, str], None]]):
+    """Register callback(provider, model), called after every successful generation."""
+    global _model_listener
+    _model_listener = callback
+
+
+def _model_used(provider: str, model: str):
+    if _model_listener is not None:
+        _model_listener(provider, model)
+
+
+def _generate(prompt: str, retries: int) -> str:
+    provider_errors = []
+    errors = []
+
+    # 1) Primary provider: Groq
+    if groq_client:
+        groq_errors = []
+        for model in GROQ_MODEL_CANDIDATES:
+            for attempt in range(retries):
+                try:
+                    response = groq_client.chat.completions.create(
+                        model=model,
+                        messages=[{"role": "user", "content": prompt}],
+                        temperature=0.3
+                    )
+                    text = (response.choices[0].message.content or "").strip()
+                    _model_used("Groq", model)
+                    return text
+                except Exception as e:
+                    err = str(e)
+                    lower_err = err.lower()
+                    groq_errors.append(f"{model}: {err}")
+                    if "429" in lower_err and attempt < retries - 1:
+                        wait = (attempt + 1) * 5
+                        time.sleep(wait)
+                        continue
+                    break
+        errors.extend(groq_errors)
+        provider_errors.append("Groq -> " + " | ".join(groq_errors[-2:]))
+
+    # 2) Fallback provider: Gemini
+    if not gemini_client and not groq_client:
+        raise AIUnavailable("Error: No AI provider configured. Add GROQ_API_KEY (recommended) or GEMINI_API_KEY.")
+
+    gemini_errors = []
+    for model in (MODEL_CANDIDATES if gemini_client else []):
+        for attempt in range(retries):
+            try:
+                response = gemini_client.models.generate_content(
+                    model=model,
+                    contents=prompt
+                )
+                _model_used("Gemini", model)
+                return response.text
+            except Exception as e:
+                err = str(e)
+                lower_err = err.lower()
+                gemini_errors.append(f"{model}: {err}")
+
+                # Model/project has no free-tier allocation; immediately try next model.
+                if "limit: 0" in lower_err or "resource_exhausted" in lower_err:
+                    break
+
+                # Transient rate limit: retry same model with backoff.
+                if "429" in lower_err and attempt < retries - 1:
+                    wait = (attempt + 1) * 10
+                    time.sleep(wait)
+                    continue
+
+                # Non-retryable error for this model.
+                break
+    errors.extend(gemini_errors)
+
+    raise AIUnavailable(
+        "Error: All configured AI providers are currently unavailable. "
+        "Check GROQ_API_KEY/GEMINI_API_KEY, quotas, and model access.\n\n"
+        + "\n".join(provider_errors[-1:]) + ("\n" if provider_errors else "")
+        + "\n".join(gemini_errors[-3:]),
+        errors,
+    )
+
+
+def ai_generate(prompt: str, retries: int = 3, raise_errors: bool = False) -> str:
+    """Generate text, falling back across providers and models.
+
+    Failures come back as an "Error: ..." string unless raise_errors is set,
+    in which case AIUnavailable is raised.
+    """
+    try:
+        return _generate(prompt, retries)
+    except AIUnavailable as e:
+        if raise_errors:
+            raise
+        return str(e)
+
+
+def _parse_json_array(raw: str) -> List[Any]:
+    """Parse a JSON array reply, tolerating a surrounding ``` fence."""
+    try:
+        clean = raw.strip()
+        if clean.startswith("```"):
+            clean = clean.split("\n", 1)[1].rsplit("```", 1)[0]
+        data = json.loads(clean)
+    except Exception as e:
+        raise ValueError(f"Could not parse JSON array: {e}") from e
+    if not isinstance(data, list):
+        raise ValueError("Reply is not a JSON array.")
+    return data
+
+
+def explain_concept(concept: str, socratic: bool = False) -> Dict[str, Any]:
+    instruction = (
+        "You are a Socratic Tutor. Never give the direct answer. Ask guiding questions."
+        if socratic else "You are a helpful, direct study buddy."
+    )
+    prompt = f"{instruction}\n\nExplain this concept clearly:\n{concept}"
+    return {"text": ai_generate(prompt), "sources": []}
+
+
+def summarize_text(text: str, length: str = "Medium", strict: bool = False, retries: int = 3) -> str:
+    length_map = {
+        "Brief": "Provide a very concise summary (2-3 sentences)",
+        "Medium": "Provide a moderate summary (1-2 paragraphs)",
+        "Detailed": "Provide a detailed summary (3-4 paragraphs)"
+    }
+    prompt = f"{length_map.get(length, 'Summarize')} of the following text:\n\n{text}"
+    return ai_generate(prompt, retries=retries, raise_errors=strict)
+
+
+def generate_quiz(topic: str, num_questions: int = 5, difficulty: str = "Medium", strict: bool = False,
+                  retries: int = 3) -> List[Dict]:
+    """Generate quiz questions.
+
+    With strict=True provider failures raise AIUnavailable and unparseable
+    replies raise ValueError instead of returning a placeholder question.
+    retries is the per-model attempt count passed to ai_generate; pass 1 when
+    the caller does its own rate-limit backoff.
+    """
+    prompt = f"""Generate {num_questions} multiple-choice quiz questions about "{topic}" at {difficulty} difficulty.
+Return ONLY a valid JSON array. Each object must have: "question", "options" (array of 4 strings), "correct" (letter A-D), "explanation".
+Do not include any text before or after the JSON array."""
+    raw = ai_generate(prompt, retries=retries, raise_errors=strict)
+    try:
+        return _parse_json_array(raw)
+    except ValueError:
+        if strict:
+            raise
+        return [{"question": raw, "options": ["A", "B", "C", "D"], "correct": "A", "explanation": "Could not parse quiz."}]
+
+
+def generate_flashcards(topic: str, num_cards: int = 10, strict: bool = False,
+                        retries: int = 3) -> List[Dict[str, str]]:
+    """Generate flashcards; strict and retries behave as in generate_quiz."""
+    prompt = f"""Generate {num_cards} flashcards for studying "{topic}".
+Return ONLY a valid JSON array. Each object must have "front" (question) and "back" (answer).
+Do not include any text before or after the JSON array."""
+    raw = ai_generate(prompt, retries=retries, raise_errors=strict)
+    try:
+        return _parse_json_array(raw)
+    except ValueError:
+        if strict:
+            raise
+        return [{"front": topic, "back": raw}]
+
+
+def analyze_document(content: str, analysis_type: str = "Summary") -> str:
+    prompts = {
+        "Summary": f"Provide a comprehensive summary of:\n\n{content}",
+        "Key Points": f"List the main key points from:\n\n{content}",
+        "Quiz Generation": f"Generate 5 quiz questions based on:\n\n{content}",
+        "Explanation": f"Explain the concepts in:\n\n{content}"
+    }
+    return ai_generate(prompts.get(analysis_type, f"Analyze:\n\n{content}"))
+
+
+def generate_mnemonics(concept: str, mnemonic_type: str = "Acronym") -> str:
+    prompts = {
+        "Acronym": f"Create an acronym mnemonic for remembering: {concept}",
+        "Method of Loci": f"Create a Method of Loci (memory palace) for: {concept}",
+        "Rhyme": f"Create a rhyming mnemonic for: {concept}",
+        "Story": f"Create a memorable story to remember: {concept}",
+        "Association": f"Create word associations to remember: {concept}"
+    }
+    return ai_generate(prompts.get(mnemonic_type, f"Create a mnemonic for: {concept}"))
+
+
+def generate_story(topic: str, style: str = "Educational", audience: str = "Adults") -> str:
+    return ai_generate(f"Write a {style} story about {topic} for {audience}. Make it engaging and educational.")
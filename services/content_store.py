@@ -0,0 +1,412 @@
+"""Process-wide, size-bounded store for large generated payloads.
+
+Quizzes, flashcard decks and document text are kept here once per process
+instead of in every user's st.session_state. Sessions hold only a handle
+(a short content hash), so identical decks generated by different users share
+one copy. Items are kept in compact __slots__ records with interned strings.
+
+When the estimated in-memory size exceeds its budget the least recently used
+payloads are spilled to disk as JSON and loaded back on the next get(). The
+disk budget is bounded too; a handle whose payload has been dropped resolves
+to None.
+
+Budgets can be set with OMNISTUDY_STORE_MAX_MB and OMNISTUDY_STORE_DISK_MB,
+and the spill directory with OMNISTUDY_STORE_DIR. Leftover spill files in that
+directory are deleted on startup; without it a temporary directory is used and
+removed when the process exits.
+"""
+import hashlib
+import itertools
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Short, highly repeated strings (option letters, difficulty labels) are
+# interned; long free text would only bloat the intern table.
+_INTERN_MAX_LEN = 64
+
+
+def _intern(value: Any) -> str:
+    text = value if isinstance(value, str) else ("" if value is None else str(value))
+    return sys.intern(text) if len(text) <= _INTERN_MAX_LEN else text
+
+
+class _Record:
+    """Read-only slotted record; get() hands the same instances to every session."""
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+
+class QuizItem(_Record):
+    __slots__ = ("question", "options", "correct", "explanation")
+
+    def __init__(self, question: str, options: tuple, correct: str, explanation: str):
+        object.__setattr__(self, "question", question)
+        object.__setattr__(self, "options", options)
+        object.__setattr__(self, "correct", correct)
+        object.__setattr__(self, "explanation", explanation)
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "QuizItem":
+        if not isinstance(data, dict):
+            return cls(_intern(data), (), _intern("A"), "")
+        options = data.get("options") or []
+        if not isinstance(options, (list, tuple)):
+            options = [options]
+        return cls(
+            _intern(data.get("question", "")),
+            tuple(_intern(o) for o in options),
+            _intern(data.get("correct", "")),
+            _intern(data.get("explanation", "")),
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "question": self.question,
+            "options": list(self.options),
+            "correct": self.correct,
+            "explanation": self.explanation,
+        }
+
+
+class Flashcard(_Record):
+    __slots__ = ("front", "back")
+
+    def __init__(self, front: str, back: str):
+        object.__setattr__(self, "front", front)
+        object.__setattr__(self, "back", back)
+
+    @classmethod
+    def from_dict(cls, data: Any) -> "Flashcard":
+        if not isinstance(data, dict):
+            return cls(_intern(data), "")
+        return cls(_intern(data.get("front", "")), _intern(data.get("back", "")))
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"front": self.front, "back": self.back}
+
+
+# kind -> record class; "text" payloads are stored as a plain str.
+RECORD_TYPES = {"quiz": QuizItem, "flashcards": Flashcard}
+
+
+def _to_json(kind: str, payload: Any) -> str:
+    if kind in RECORD_TYPES:
+        payload = [item.to_dict() for item in payload]
+    return json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _from_json(kind: str, raw: str) -> Any:
+    data = json.loads(raw)
+    if kind in RECORD_TYPES:
+        return tuple(RECORD_TYPES[kind].from_dict(item) for item in data)
+    return data
+
+
+# Approximate intern-table cost of one interned string (dict entry + index).
+_INTERN_SLOT = 48
+
+# An OrderedDict entry: ~48 bytes of dict entry (hash, key, value) and index at
+# typical load, plus ~56 for the linked-list node that keeps insertion order.
+_ODICT_ENTRY = 104
+
+# Bookkeeping per stored entry on top of the payload: the handle string, the
+# entry tuple and its OrderedDict entry.
+_ENTRY_OVERHEAD = sys.getsizeof("quiz:" + "0" * 32) + sys.getsizeof((None, 0, 0)) + _ODICT_ENTRY
+
+
+def _footprint(payload: Any) -> int:
+    """Estimate the Python heap used by a payload (records, tuples and strings).
+
+    Each distinct object is counted once per payload, plus its intern-table
+    slot for short strings; strings shared with other payloads through
+    interning are still counted, so this errs on the high side.
+    """
+    if isinstance(payload, str):
+        return sys.getsizeof(payload)
+    seen = set()
+    size = 0
+
+    def add(obj):
+        nonlocal size
+        if id(obj) not in seen:
+            seen.add(id(obj))
+            size += sys.getsizeof(obj)
+            if isinstance(obj, str) and len(obj) <= _INTERN_MAX_LEN:
+                size += _INTERN_SLOT
+
+    add(payload)
+    for item in payload:
+        add(item)
+        for name in item.__slots__:
+            value = getattr(item, name)
+            add(value)
+            if isinstance(value, tuple):
+                for part in value:
+                    add(part)
+    return size
+
+
+_SPILL_FILE = re.compile(r"^[\w.-]+-[0-9a-f]{32}-\d+\.json$")
+
+
+class ContentStore:
+    """Content-addressed LRU store with spill-to-disk. Safe to share across sessions.
+
+    The lock only guards bookkeeping; spill files are written, read and removed
+    outside it so one session's disk I/O never blocks another's lookups.
+    """
+
+    def __init__(self, max_bytes: int, max_disk_bytes: int, spill_dir: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        if spill_dir:
+            # Handles do not survive a restart, so spill files from earlier runs are garbage.
+            os.makedirs(spill_dir, exist_ok=True)
+            for name in os.listdir(spill_dir):
+                if _SPILL_FILE.match(name):
+                    _unlink(os.path.join(spill_dir, name))
+            self._tmpdir = None
+        else:
+            # Removed automatically when the process exits.
+            self._tmpdir = tempfile.TemporaryDirectory(prefix="omnistudy-store-")
+            spill_dir = self._tmpdir.name
+        self.spill_dir = spill_dir
+
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        # handle -> (payload, memory size, disk size); most recently used last
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        # handle -> (entry, path) while its spill file is being written
+        self._spilling: Dict[str, tuple] = {}
+        # handle -> (disk size, path); oldest spill first
+        self._disk: "OrderedDict[str, tuple]" = OrderedDict()
+        # handle -> Event set once a disk load finishes
+        self._loading: Dict[str, threading.Event] = {}
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._stats = {"puts": 0, "dedup_hits": 0, "hits": 0, "disk_loads": 0, "misses": 0, "spills": 0, "dropped": 0}
+
+    def put(self, kind: str, payload: Any) -> str:
+        """Store a payload ("quiz"/"flashcards" item lists or "text") and return its handle."""
+        if kind in RECORD_TYPES:
+            if not isinstance(payload, (list, tuple)):
+                payload = [payload] if payload else []
+            payload = tuple(RECORD_TYPES[kind].from_dict(item) for item in payload)
+        elif not isinstance(payload, str):
+            payload = "" if payload is None else str(payload)
+        raw = _to_json(kind, payload)
+        handle = f"{kind}:{hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]}"
+        entry = (payload, _footprint(payload) + _ENTRY_OVERHEAD, len(raw.encode("utf-8")))
+
+        stale = []
+        with self._lock:
+            self._stats["puts"] += 1
+            if handle in self._memory:
+                self._stats["dedup_hits"] += 1
+                self._memory.move_to_end(handle)
+                return handle
+            if handle in self._spilling:
+                self._stats["dedup_hits"] += 1
+                entry = self._unspill(handle)
+            elif handle in self._disk:
+                self._stats["dedup_hits"] += 1
+                size, path = self._disk.pop(handle)
+                self._disk_bytes -= size
+                stale.append(path)
+            self._admit(handle, entry)
+            evicted = self._collect_evictions(stale)
+        self._write_spills(evicted, stale)
+        return handle
+
+    def get(self, handle: Optional[str]) -> Any:
+        """Return the payload for a handle, or None if it is unknown or was dropped.
+
+        Quiz and flashcard payloads are tuples of read-only records shared by
+        every session holding the handle.
+        """
+        if not handle:
+            return None
+        while True:
+            with self._lock:
+                entry = self._memory.get(handle)
+                if entry is not None:
+                    self._stats["hits"] += 1
+                    self._memory.move_to_end(handle)
+                    return entry[0]
+                if handle in self._spilling:
+                    self._stats["hits"] += 1
+                    entry = self._unspill(handle)
+                    self._admit(handle, entry)
+                    stale = []
+                    evicted = self._collect_evictions(stale)
+                    break
+                pending = self._loading.get(handle)
+                if pending is None:
+                    if handle not in self._disk:
+                        self._stats["misses"] += 1
+                        return None
+                    size, path = self._disk.pop(handle)
+                    self._disk_bytes -= size
+                    done = self._loading[handle] = threading.Event()
+            if pending is not None:
+                # Another session is loading this handle; use its result.
+                pending.wait()
+                continue
+            return self._load(handle, path, done)
+
+        self._write_spills(evicted, stale)
+        return entry[0]
+
+    def memory_report(self) -> Dict[str, Any]:
+        """Sizes and counters for capacity planning.
+
+        Memory figures are estimated heap bytes (see _footprint); disk figures
+        are the sizes of the JSON spill files.
+        """
+        with self._lock:
+            by_kind: Dict[str, Dict[str, int]] = {}
+            for handle, (_, size, _) in self._memory.items():
+                kind = by_kind.setdefault(handle.split(":", 1)[0], {"items": 0, "est_memory_bytes": 0})
+                kind["items"] += 1
+                kind["est_memory_bytes"] += size
+            return {
+                "memory_items": len(self._memory),
+                "est_memory_bytes": self._memory_bytes,
+                "memory_limit_bytes": self.max_bytes,
+                "disk_items": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_limit_bytes": self.max_disk_bytes,
+                "by_kind": by_kind,
+                **self._stats,
+            }
+
+    def _load(self, handle: str, path: str, done: threading.Event) -> Any:
+        payload = None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                raw = f.read()
+            payload = _from_json(handle.split(":", 1)[0], raw)
+        except (OSError, ValueError):
+            raw = None
+        _unlink(path)
+
+        stale = []
+        evicted = []
+        with self._lock:
+            if handle in self._memory:
+                # Re-put by another session while we were reading; that copy wins
+                # even if our read failed.
+                self._stats["hits"] += 1
+                payload = self._memory[handle][0]
+            elif handle in self._spilling:
+                self._stats["hits"] += 1
+                payload = self._spilling[handle][0][0]
+            elif raw is None:
+                self._stats["misses"] += 1
+            else:
+                self._stats["disk_loads"] += 1
+                self._admit(handle, (payload, _footprint(payload) + _ENTRY_OVERHEAD, len(raw.encode("utf-8"))))
+                evicted = self._collect_evictions(stale)
+            del self._loading[handle]
+            done.set()
+        self._write_spills(evicted, stale)
+        return payload
+
+    # The helpers below that take no lock expect the caller to hold self._lock.
+
+    def _admit(self, handle: str, entry: tuple):
+        self._memory[handle] = entry
+        self._memory_bytes += entry[1]
+
+    def _unspill(self, handle: str) -> tuple:
+        """Take back an entry whose spill write is still in flight."""
+        entry, _ = self._spilling.pop(handle)
+        self._disk_bytes -= entry[2]
+        return entry
+
+    def _collect_evictions(self, stale: list) -> list:
+        """Pick LRU entries to spill and spill files to drop to fit both budgets.
+
+        Returns (handle, entry, path) triples to write; paths to delete are
+        appended to stale. Disk space for pending writes is reserved up front.
+        """
+        evicted = []
+        # Always keep the most recent entry in memory, even if it alone is over budget.
+        while self._memory_bytes > self.max_bytes and len(self._memory) > 1:
+            handle, entry = self._memory.popitem(last=False)
+            self._memory_bytes -= entry[1]
+            if entry[2] > self.max_disk_bytes:
+                self._stats["dropped"] += 1
+                continue
+            path = os.path.join(self.spill_dir, f"{handle.replace(':', '-')}-{next(self._seq)}.json")
+            self._spilling[handle] = (entry, path)
+            self._disk_bytes += entry[2]
+            evicted.append((handle, entry, path))
+
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            _, (size, path) = self._disk.popitem(last=False)
+            self._disk_bytes -= size
+            stale.append(path)
+            self._stats["dropped"] += 1
+        return evicted
+
+    def _write_spills(self, evicted: list, stale: list):
+        for path in stale:
+            _unlink(path)
+        for handle, entry, path in evicted:
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(_to_json(handle.split(":", 1)[0], entry[0]))
+                written = True
+            except OSError:
+                written = False
+
+            with self._lock:
+                pending = self._spilling.get(handle)
+                ours = pending is not None and pending[1] == path
+                if ours:
+                    del self._spilling[handle]
+                    if written:
+                        self._disk[handle] = (entry[2], path)
+                        self._stats["spills"] += 1
+                    else:
+                        self._disk_bytes -= entry[2]
+                        self._stats["dropped"] += 1
+            if not ours or not written:
+                # Taken back into memory meanwhile (or the write failed): the file is unused.
+                _unlink(path)
+
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ContentStore:
+    """Return the process-wide store, creating it from the environment on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ContentStore(
+                max_bytes=int(float(os.getenv("OMNISTUDY_STORE_MAX_MB", "64")) * 1024 * 1024),
+                max_disk_bytes=int(float(os.getenv("OMNISTUDY_STORE_DISK_MB", "512")) * 1024 * 1024),
+                spill_dir=os.getenv("OMNISTUDY_STORE_DIR") or None,
+            )
+        return _store
@@ -1,10 +1,12 @@
 import streamlit as st
-from google import genai
 import os
-import json
 import requests
-from typing import Optional, List, Dict, Any
-import importlib
+from services.ai_service import (
+    AI_MODEL, GEMINI_API_KEY, GROQ_API_KEY, GROQ_MODEL_CANDIDATES, INIT_ERRORS,
+    analyze_document, explain_concept, generate_flashcards, generate_mnemonics,
+    generate_quiz, generate_story, groq_client, set_model_listener, summarize_text,
+)
+from services.content_store import get_store
 
 # Page configuration - MUST be first Streamlit command
 st.set_page_config(
@@ -15,212 +17,34 @@ st.set_page_config(
 )
 
 # ─── API Keys from Streamlit Secrets ───
-try:
-    GEMINI_API_KEY = st.secrets["GEMINI_API_KEY"]
-except Exception:
-    GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-
-try:
-    GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
-except Exception:
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
-
 try:
     FIREBASE_WEB_API_KEY = st.secrets["FIREBASE_WEB_API_KEY"]
 except Exception:
     FIREBASE_WEB_API_KEY = os.getenv("FIREBASE_WEB_API_KEY", "")
 
-# ─── Initialize Gemini Client ───
-gemini_client = None
-if GEMINI_API_KEY:
-    try:
-        gemini_client = genai.Client(api_key=GEMINI_API_KEY)
-    except Exception as e:
-        st.error(f"Failed to initialize Gemini: {str(e)}")
-
-# ─── Initialize Groq Client ───
-groq_client = None
-Groq = None
-try:
-    Groq = getattr(importlib.import_module("groq"), "Groq")
-except Exception:
-    Groq = None
-
-if GROQ_API_KEY and Groq is not None:
-    try:
-        groq_client = Groq(api_key=GROQ_API_KEY)
-    except Exception as e:
-        st.error(f"Failed to initialize Groq: {str(e)}")
-elif GROQ_API_KEY and Groq is None:
-    st.error("Groq SDK not installed. Add 'groq' to requirements.txt.")
+for _error in INIT_ERRORS:
+    st.error(_error)
 
 if not GROQ_API_KEY and not GEMINI_API_KEY:
     st.error("No AI API key found. Add GROQ_API_KEY (recommended) or GEMINI_API_KEY in Secrets.")
 
-# Model configuration used by all Gemini calls in this app
-# You can override from secrets/env with GEMINI_MODELS="model-a,model-b"
-try:
-    _models_raw = st.secrets.get("GEMINI_MODELS", "")
-except Exception:
-    _models_raw = ""
-if not _models_raw:
-    _models_raw = os.getenv("GEMINI_MODELS", "")
-
-MODEL_CANDIDATES = [m.strip() for m in _models_raw.split(",") if m.strip()] if _models_raw else [
-    "gemini-1.5-flash",
-    "gemini-1.5-flash-8b",
-    "gemini-2.0-flash"
-]
-AI_MODEL = MODEL_CANDIDATES[0]
+# Large generated payloads live in one process-wide store; sessions keep handles.
+content_store = get_store()
 
+# Operator diagnostic: show the store's memory report in the sidebar.
 try:
-    _groq_models_raw = st.secrets.get("GROQ_MODELS", "")
+    _show_store_raw = st.secrets.get("OMNISTUDY_SHOW_STORE_REPORT", "")
 except Exception:
-    _groq_models_raw = ""
-if not _groq_models_raw:
-    _groq_models_raw = os.getenv("GROQ_MODELS", "")
-
-GROQ_MODEL_CANDIDATES = [m.strip() for m in _groq_models_raw.split(",") if m.strip()] if _groq_models_raw else [
-    "llama-3.3-70b-versatile",
-    "llama-3.1-8b-instant"
-]
+    _show_store_raw = ""
+if not _show_store_raw:
+    _show_store_raw = os.getenv("OMNISTUDY_SHOW_STORE_REPORT", "")
+SHOW_STORE_REPORT = str(_show_store_raw).strip().lower() in ("1", "true", "yes", "on")
 
-# ─── Gemini AI Helper Functions ───
-
-def ai_generate(prompt: str, retries: int = 3) -> str:
-    import time
-    provider_errors = []
-
-    # 1) Primary provider: Groq
-    if groq_client:
-        groq_errors = []
-        for model in GROQ_MODEL_CANDIDATES:
-            for attempt in range(retries):
-                try:
-                    response = groq_client.chat.completions.create(
-                        model=model,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=0.3
-                    )
-                    text = (response.choices[0].message.content or "").strip()
-                    st.session_state.last_ai_model = model
-                    st.session_state.last_ai_provider = "Groq"
-                    return text
-                except Exception as e:
-                    err = str(e)
-                    lower_err = err.lower()
-                    groq_errors.append(f"{model}: {err}")
-                    if "429" in lower_err and attempt < retries - 1:
-                        wait = (attempt + 1) * 5
-                        time.sleep(wait)
-                        continue
-                    break
-        provider_errors.append("Groq -> " + " | ".join(groq_errors[-2:]))
-
-    # 2) Fallback provider: Gemini
-    if not gemini_client:
-        return "Error: No AI provider configured. Add GROQ_API_KEY (recommended) or GEMINI_API_KEY."
-
-    errors = []
-    for model in MODEL_CANDIDATES:
-        for attempt in range(retries):
-            try:
-                response = gemini_client.models.generate_content(
-                    model=model,
-                    contents=prompt
-                )
-                st.session_state.last_ai_model = model
-                st.session_state.last_ai_provider = "Gemini"
-                return response.text
-            except Exception as e:
-                err = str(e)
-                lower_err = err.lower()
-                errors.append(f"{model}: {err}")
-
-                # Model/project has no free-tier allocation; immediately try next model.
-                if "limit: 0" in lower_err or "resource_exhausted" in lower_err:
-                    break
-
-                # Transient rate limit: retry same model with backoff.
-                if "429" in lower_err and attempt < retries - 1:
-                    wait = (attempt + 1) * 10
-                    time.sleep(wait)
-                    continue
-
-                # Non-retryable error for this model.
-                break
-
-    return (
-        "Error: All configured AI providers are currently unavailable. "
-        "Check GROQ_API_KEY/GEMINI_API_KEY, quotas, and model access.\n\n"
-        + "\n".join(provider_errors[-1:]) + ("\n" if provider_errors else "")
-        + "\n".join(errors[-3:])
-    )
-
-def explain_concept(concept: str, socratic: bool = False) -> Dict[str, Any]:
-    instruction = (
-        "You are a Socratic Tutor. Never give the direct answer. Ask guiding questions."
-        if socratic else "You are a helpful, direct study buddy."
-    )
-    prompt = f"{instruction}\n\nExplain this concept clearly:\n{concept}"
-    return {"text": ai_generate(prompt), "sources": []}
-
-def summarize_text(text: str, length: str = "Medium") -> str:
-    length_map = {
-        "Brief": "Provide a very concise summary (2-3 sentences)",
-        "Medium": "Provide a moderate summary (1-2 paragraphs)",
-        "Detailed": "Provide a detailed summary (3-4 paragraphs)"
-    }
-    prompt = f"{length_map.get(length, 'Summarize')} of the following text:\n\n{text}"
-    return ai_generate(prompt)
-
-def generate_quiz(topic: str, num_questions: int = 5, difficulty: str = "Medium") -> List[Dict]:
-    prompt = f"""Generate {num_questions} multiple-choice quiz questions about "{topic}" at {difficulty} difficulty.
-Return ONLY a valid JSON array. Each object must have: "question", "options" (array of 4 strings), "correct" (letter A-D), "explanation".
-Do not include any text before or after the JSON array."""
-    raw = ai_generate(prompt)
-    try:
-        clean = raw.strip()
-        if clean.startswith("```"):
-            clean = clean.split("\n", 1)[1].rsplit("```", 1)[0]
-        return json.loads(clean)
-    except Exception:
-        return [{"question": raw, "options": ["A", "B", "C", "D"], "correct": "A", "explanation": "Could not parse quiz."}]
-
-def generate_flashcards(topic: str, num_cards: int = 10) -> List[Dict[str, str]]:
-    prompt = f"""Generate {num_cards} flashcards for studying "{topic}".
-Return ONLY a valid JSON array. Each object must have "front" (question) and "back" (answer).
-Do not include any text before or after the JSON array."""
-    raw = ai_generate(prompt)
-    try:
-        clean = raw.strip()
-        if clean.startswith("```"):
-            clean = clean.split("\n", 1)[1].rsplit("```", 1)[0]
-        return json.loads(clean)
-    except Exception:
-        return [{"front": topic, "back": raw}]
-
-def analyze_document(content: str, analysis_type: str = "Summary") -> str:
-    prompts = {
-        "Summary": f"Provide a comprehensive summary of:\n\n{content}",
-        "Key Points": f"List the main key points from:\n\n{content}",
-        "Quiz Generation": f"Generate 5 quiz questions based on:\n\n{content}",
-        "Explanation": f"Explain the concepts in:\n\n{content}"
-    }
-    return ai_generate(prompts.get(analysis_type, f"Analyze:\n\n{content}"))
-
-def generate_mnemonics(concept: str, mnemonic_type: str = "Acronym") -> str:
-    prompts = {
-        "Acronym": f"Create an acronym mnemonic for remembering: {concept}",
-        "Method of Loci": f"Create a Method of Loci (memory palace) for: {concept}",
-        "Rhyme": f"Create a rhyming mnemonic for: {concept}",
-        "Story": f"Create a memorable story to remember: {concept}",
-        "Association": f"Create word associations to remember: {concept}"
-    }
-    return ai_generate(prompts.get(mnemonic_type, f"Create a mnemonic for: {concept}"))
+def _record_ai_model(provider: str, model: str):
+    st.session_state.last_ai_model = model
+    st.session_state.last_ai_provider = provider
 
-def generate_story(topic: str, style: str = "Educational", audience: str = "Adults") -> str:
-    return ai_generate(f"Write a {style} story about {topic} for {audience}. Make it engaging and educational.")
+set_model_listener(_record_ai_model)
 
 # ─── Firebase Auth (REST API) ───
 
@@ -357,14 +181,15 @@ def render_quiz_maker():
         if topic:
             with st.spinner("Generating quiz..."):
                 quiz = generate_quiz(topic, num_q, difficulty)
-                st.session_state.quiz = quiz
-    if "quiz" in st.session_state and st.session_state.quiz:
-        for i, q in enumerate(st.session_state.quiz, 1):
-            with st.expander(f"Q{i}: {q.get('question', 'Question')}"):
-                for opt in q.get("options", []):
+                st.session_state.quiz = content_store.put("quiz", quiz)
+    quiz = content_store.get(st.session_state.get("quiz"))
+    if quiz:
+        for i, q in enumerate(quiz, 1):
+            with st.expander(f"Q{i}: {q.question or 'Question'}"):
+                for opt in q.options:
                     st.write(f"  {opt}")
-                st.success(f"Answer: {q.get('correct', 'N/A')}")
-                st.info(f"Explanation: {q.get('explanation', '')}")
+                st.success(f"Answer: {q.correct or 'N/A'}")
+                st.info(f"Explanation: {q.explanation}")
     if st.button("← Back to Dashboard"):
         st.session_state.current_view = "dashboard"
         st.rerun()
@@ -376,11 +201,12 @@ def render_flashcards():
     if st.button("Generate Flashcards", type="primary"):
         if topic:
             with st.spinner("Generating flashcards..."):
-                st.session_state.flashcards = generate_flashcards(topic, num_cards)
-    if "flashcards" in st.session_state and st.session_state.flashcards:
-        for i, card in enumerate(st.session_state.flashcards, 1):
-            with st.expander(f"Card {i}: {card.get('front', 'Question')}"):
-                st.write(card.get("back", "Answer"))
+                st.session_state.flashcards = content_store.put("flashcards", generate_flashcards(topic, num_cards))
+    flashcards = content_store.get(st.session_state.get("flashcards"))
+    if flashcards:
+        for i, card in enumerate(flashcards, 1):
+            with st.expander(f"Card {i}: {card.front or 'Question'}"):
+                st.write(card.back or "Answer")
     if st.button("← Back to Dashboard"):
         st.session_state.current_view = "dashboard"
         st.rerun()
@@ -493,6 +319,12 @@ else:
         st.caption(f"Provider: {st.session_state.last_ai_provider}")
         st.caption(f"Model: {st.session_state.last_ai_model}")
         st.caption(f"API Key: ...{shown_key[-8:] if shown_key else 'NOT SET'}")
+        if SHOW_STORE_REPORT:
+            with st.expander("📦 Content store"):
+                report = content_store.memory_report()
+                st.caption(f"Memory (est.): {report['est_memory_bytes'] / 1048576:.1f} / {report['memory_limit_bytes'] / 1048576:.0f} MB ({report['memory_items']} items)")
+                st.caption(f"Disk: {report['disk_bytes'] / 1048576:.1f} / {report['disk_limit_bytes'] / 1048576:.0f} MB ({report['disk_items']} items)")
+                st.json(report, expanded=False)
         st.divider()
         nav = {
             "📊 Dashboard": "dashboard",
@@ -0,0 +1,37 @@
+import pytest
+
+from services import ai_service
+from services.ai_service import AIUnavailable
+
+
+def test_quota_limited_only_looks_at_model_errors():
+    wrapper = "Error: ... Check GROQ_API_KEY/GEMINI_API_KEY, quotas, and model access."
+    assert not AIUnavailable(wrapper, ["gemini-2.0-flash: 404 NOT_FOUND"]).quota_limited
+    assert not AIUnavailable(wrapper).quota_limited
+    assert AIUnavailable(wrapper, ["llama: Error code: 429"]).quota_limited
+    assert AIUnavailable(wrapper, ["gemini-1.5-flash: RESOURCE_EXHAUSTED"]).quota_limited
+
+
+def test_config_error_needs_every_model_unusable():
+    assert AIUnavailable("Error: No AI provider configured.").config_error
+    assert AIUnavailable("", ["llama: 401 invalid_api_key", "gemini: 404 NOT_FOUND"]).config_error
+    assert not AIUnavailable("", ["llama: 401 invalid_api_key", "gemini: 400 INVALID_ARGUMENT"]).config_error
+    assert not AIUnavailable("", ["llama: 401 invalid_api_key", "gemini: 429 RESOURCE_EXHAUSTED"]).config_error
+
+
+def test_parse_json_array_strips_fence():
+    assert ai_service._parse_json_array('```json\n[{"front": "a"}]\n```') == [{"front": "a"}]
+
+
+@pytest.mark.parametrize("raw", ["Here are your cards:", '{"front": "a"}', "```"])
+def test_parse_json_array_rejects_non_arrays(raw):
+    with pytest.raises(ValueError):
+        ai_service._parse_json_array(raw)
+
+
+def test_strict_generation_raises_on_unparseable_reply(monkeypatch):
+    monkeypatch.setattr(ai_service, "_generate", lambda prompt, retries: "Sure! Here is a quiz.")
+
+    with pytest.raises(ValueError):
+        ai_service.generate_quiz("Cells", strict=True)
+    assert ai_service.generate_quiz("Cells")[0]["explanation"] == "Could not parse quiz."
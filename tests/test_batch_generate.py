@@ -0,0 +1,216 @@
+import json
+
+import pytest
+
+import batch_generate
+from services import ai_service
+from services.ai_service import AIUnavailable
+
+
+def _quiz(topic, num_questions, difficulty, strict=False, retries=3):
+    return [{"question": f"{topic}?", "options": ["a", "b", "c", "d"], "correct": "A", "explanation": ""}]
+
+
+def _flashcards(topic, num_cards, strict=False, retries=3):
+    return [{"front": topic, "back": "answer"}]
+
+
+def _summary(text, length, strict=False, retries=3):
+    return f"summary of {text}"
+
+
+@pytest.fixture
+def stubs(monkeypatch):
+    monkeypatch.setattr(batch_generate, "generate_quiz", _quiz)
+    monkeypatch.setattr(batch_generate, "generate_flashcards", _flashcards)
+    monkeypatch.setattr(batch_generate, "summarize_text", _summary)
+    monkeypatch.setattr(batch_generate.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(ai_service, "groq_client", object())
+    return monkeypatch
+
+
+@pytest.fixture
+def syllabus(tmp_path):
+    path = tmp_path / "syllabus.txt"
+    path.write_text("# term 1\nCells\n\nAtoms\nCells\n", encoding="utf-8")
+    return path
+
+
+def _run(syllabus, output):
+    return batch_generate.main([str(syllabus), "-o", str(output), "--workers", "1", "--rpm", "0", "--backoff", "0"])
+
+
+def _records(output):
+    return [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+
+
+def test_load_checkpoint_truncates_torn_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    good = json.dumps({"topic": "Cells", "kind": "quiz"}) + "\n"
+    output.write_text(good + '{"topic": "Ato', encoding="utf-8")
+
+    assert batch_generate.load_checkpoint(str(output)) == {("Cells", "quiz")}
+    assert output.read_text(encoding="utf-8") == good
+
+
+def test_load_checkpoint_stops_at_non_object_line(tmp_path):
+    output = tmp_path / "out.jsonl"
+    good = json.dumps({"topic": "Cells", "kind": "quiz"}) + "\n"
+    output.write_text(good + "5\n" + json.dumps({"topic": "Atoms", "kind": "quiz"}) + "\n", encoding="utf-8")
+
+    assert batch_generate.load_checkpoint(str(output)) == {("Cells", "quiz")}
+    assert output.read_text(encoding="utf-8") == good
+
+
+def test_rate_limiter_spaces_requests(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(batch_generate.time, "monotonic", lambda: 100.0)
+    monkeypatch.setattr(batch_generate.time, "sleep", sleeps.append)
+
+    limiter = batch_generate.RateLimiter(60)
+    limiter.wait()
+    limiter.wait()
+    limiter.penalize(10)
+    limiter.wait()
+
+    assert sleeps == [1.0, 10.0]
+
+
+def test_rate_limiter_unlimited(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(batch_generate.time, "sleep", sleeps.append)
+
+    limiter = batch_generate.RateLimiter(0)
+    for _ in range(5):
+        limiter.wait()
+
+    assert sleeps == []
+
+
+def test_generates_every_kind_once(stubs, syllabus, tmp_path):
+    output = tmp_path / "out.jsonl"
+
+    assert _run(syllabus, output) == batch_generate.EXIT_OK
+    assert sorted((r["topic"], r["kind"]) for r in _records(output)) == sorted(
+        (topic, kind) for topic in ("Cells", "Atoms") for kind in batch_generate.KINDS
+    )
+
+    # Everything is checkpointed, so a rerun has nothing to do.
+    stubs.setattr(batch_generate, "generate_quiz", None)
+    assert _run(syllabus, output) == batch_generate.EXIT_OK
+    assert len(_records(output)) == 6
+
+
+def test_quota_stop_resumes(stubs, syllabus, tmp_path):
+    output = tmp_path / "out.jsonl"
+    calls = []
+
+    def rate_limited(topic, num_questions, difficulty, strict=False, retries=3):
+        calls.append(topic)
+        raise AIUnavailable("Error: unavailable", ["gemini-2.0-flash: 429 RESOURCE_EXHAUSTED"])
+
+    stubs.setattr(batch_generate, "generate_quiz", rate_limited)
+    assert _run(syllabus, output) == batch_generate.EXIT_QUOTA
+    assert len(calls) == 3  # one topic, retried --retries times, then the run stops
+    assert "quiz" not in {r["kind"] for r in _records(output)}
+
+    stubs.setattr(batch_generate, "generate_quiz", _quiz)
+    assert _run(syllabus, output) == batch_generate.EXIT_OK
+    assert len(_records(output)) == 6
+
+
+def test_non_quota_error_is_item_failure(stubs, syllabus, tmp_path):
+    output = tmp_path / "out.jsonl"
+    calls = []
+
+    def bad_request(topic, num_questions, difficulty, strict=False, retries=3):
+        calls.append(topic)
+        raise AIUnavailable(
+            "Error: All configured AI providers are currently unavailable. "
+            "Check GROQ_API_KEY/GEMINI_API_KEY, quotas, and model access.",
+            ["gemini-2.0-flash: 400 INVALID_ARGUMENT"],
+        )
+
+    stubs.setattr(batch_generate, "generate_quiz", bad_request)
+    assert _run(syllabus, output) == batch_generate.EXIT_FAILURES
+    assert calls == ["Cells", "Atoms"]
+    assert len(_records(output)) == 4
+
+
+def test_unparseable_reply_is_not_checkpointed(stubs, syllabus, tmp_path):
+    output = tmp_path / "out.jsonl"
+
+    def unparseable(topic, num_cards, strict=False, retries=3):
+        raise ValueError("Could not parse JSON array")
+
+    stubs.setattr(batch_generate, "generate_flashcards", unparseable)
+    assert _run(syllabus, output) == batch_generate.EXIT_FAILURES
+    assert "flashcards" not in {r["kind"] for r in _records(output)}
+
+    stubs.setattr(batch_generate, "generate_flashcards", _flashcards)
+    assert _run(syllabus, output) == batch_generate.EXIT_OK
+    assert len(_records(output)) == 6
+
+
+class _RateLimitedGroq:
+    def __init__(self, calls):
+        self.chat = self
+        self.completions = self
+        self.calls = calls
+
+    def create(self, model, messages, temperature):
+        self.calls.append(model)
+        raise Exception("Error code: 429 - rate_limit_exceeded")
+
+
+class _RateLimitedGemini:
+    def __init__(self, calls):
+        self.models = self
+        self.calls = calls
+
+    def generate_content(self, model, contents):
+        self.calls.append(model)
+        raise Exception("429 RESOURCE_EXHAUSTED")
+
+
+def test_rate_limited_item_calls_each_model_once_per_attempt(stubs, syllabus, tmp_path):
+    calls = []
+    stubs.setattr(batch_generate, "generate_quiz", ai_service.generate_quiz)
+    stubs.setattr(ai_service, "groq_client", _RateLimitedGroq(calls))
+    stubs.setattr(ai_service, "gemini_client", _RateLimitedGemini(calls))
+    stubs.setattr(ai_service, "GROQ_MODEL_CANDIDATES", ["llama"])
+    stubs.setattr(ai_service, "MODEL_CANDIDATES", ["gemini"])
+
+    output = tmp_path / "out.jsonl"
+    code = batch_generate.main([str(syllabus), "-o", str(output), "--kinds", "quiz",
+                                "--workers", "1", "--rpm", "0", "--backoff", "0"])
+
+    assert code == batch_generate.EXIT_QUOTA
+    # --retries 3 outer attempts x one pass over the two fallback models; no inner retries.
+    assert calls == ["llama", "gemini"] * 3
+
+
+def test_exits_before_queueing_without_provider(stubs, syllabus, tmp_path):
+    calls = []
+    stubs.setattr(ai_service, "groq_client", None)
+    stubs.setattr(ai_service, "gemini_client", None)
+    stubs.setattr(batch_generate, "generate_quiz", lambda *args, **kwargs: calls.append(args))
+
+    output = tmp_path / "out.jsonl"
+    assert _run(syllabus, output) == batch_generate.EXIT_CONFIG
+    assert calls == []
+    assert not output.exists()
+
+
+def test_auth_error_stops_run(stubs, syllabus, tmp_path):
+    output = tmp_path / "out.jsonl"
+    calls = []
+
+    def bad_key(topic, num_questions, difficulty, strict=False, retries=3):
+        calls.append(topic)
+        raise AIUnavailable("Error: unavailable", ["llama: Error code: 401 - invalid_api_key"])
+
+    stubs.setattr(batch_generate, "generate_quiz", bad_key)
+    assert _run(syllabus, output) == batch_generate.EXIT_CONFIG
+    assert calls == ["Cells"]
+    assert _records(output) == []
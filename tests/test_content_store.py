@@ -0,0 +1,136 @@
+import os
+import threading
+
+import pytest
+
+from services.content_store import ContentStore, Flashcard
+
+
+def _deck(i, n=3):
+    return [{"front": f"front {i}-{j}", "back": "back " * 20} for j in range(n)]
+
+
+def test_identical_payloads_share_one_entry(tmp_path):
+    store = ContentStore(max_bytes=10**6, max_disk_bytes=10**6, spill_dir=str(tmp_path))
+
+    first = store.put("flashcards", _deck(1))
+    second = store.put("flashcards", _deck(1))
+
+    assert first == second
+    report = store.memory_report()
+    assert report["memory_items"] == 1
+    assert report["dedup_hits"] == 1
+    cards = store.get(first)
+    assert isinstance(cards[0], Flashcard) and cards[0].front == "front 1-0"
+
+
+def test_spills_to_disk_and_loads_back(tmp_path):
+    one_deck = ContentStore(10**9, 10**9)
+    one_deck.put("flashcards", _deck(0))
+    deck_size = one_deck.memory_report()["est_memory_bytes"]
+
+    store = ContentStore(max_bytes=deck_size * 3, max_disk_bytes=10**6, spill_dir=str(tmp_path))
+    handles = [store.put("flashcards", _deck(i)) for i in range(10)]
+
+    report = store.memory_report()
+    assert report["est_memory_bytes"] <= deck_size * 3
+    assert report["disk_items"] == 10 - report["memory_items"]
+    assert len(os.listdir(tmp_path)) == report["disk_items"]
+
+    assert store.get(handles[0])[0].front == "front 0-0"
+    assert store.memory_report()["disk_loads"] == 1
+
+
+def test_disk_budget_drops_oldest(tmp_path):
+    store = ContentStore(max_bytes=1, max_disk_bytes=1000, spill_dir=str(tmp_path))
+    handles = [store.put("flashcards", _deck(i)) for i in range(20)]
+
+    report = store.memory_report()
+    assert report["disk_bytes"] <= 1000
+    assert report["dropped"] > 0
+    assert store.get(handles[0]) is None
+    assert sum(os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)) == report["disk_bytes"]
+
+
+def test_clears_leftover_spill_files(tmp_path):
+    leftover = tmp_path / ("flashcards-" + "a" * 32 + "-7.json")
+    leftover.write_text("[]", encoding="utf-8")
+    unrelated = tmp_path / "notes.json"
+    unrelated.write_text("{}", encoding="utf-8")
+
+    ContentStore(max_bytes=10**6, max_disk_bytes=10**6, spill_dir=str(tmp_path))
+
+    assert not leftover.exists()
+    assert unrelated.exists()
+
+
+def test_default_spill_dir_is_temporary():
+    store = ContentStore(max_bytes=1, max_disk_bytes=10**6)
+    for i in range(3):
+        store.put("flashcards", _deck(i))
+    spill_dir = store.spill_dir
+    assert os.listdir(spill_dir)
+
+    del store
+    assert not os.path.exists(spill_dir)
+
+
+def test_concurrent_sessions_see_consistent_payloads(tmp_path):
+    store = ContentStore(max_bytes=20000, max_disk_bytes=10**7, spill_dir=str(tmp_path))
+    handles = [store.put("flashcards", _deck(i)) for i in range(30)]
+    errors = []
+
+    def session(offset):
+        for round_ in range(200):
+            i = (offset + round_) % 30
+            cards = store.get(handles[i])
+            if cards is None or cards[0].front != f"front {i}-0":
+                errors.append(i)
+            if round_ % 7 == 0:
+                store.put("flashcards", _deck(i))
+
+    threads = [threading.Thread(target=session, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    report = store.memory_report()
+    assert report["memory_items"] + report["disk_items"] == 30
+    assert len(os.listdir(tmp_path)) == report["disk_items"]
+
+
+def test_records_are_read_only(tmp_path):
+    store = ContentStore(max_bytes=10**6, max_disk_bytes=10**6, spill_dir=str(tmp_path))
+    quiz = store.get(store.put("quiz", [{"question": "Q", "options": ["a", "b"], "correct": "A", "explanation": ""}]))
+    cards = store.get(store.put("flashcards", _deck(1)))
+
+    with pytest.raises(AttributeError):
+        quiz[0].correct = "B"
+    with pytest.raises(AttributeError):
+        del cards[0].back
+    assert quiz[0].correct == "A"
+
+
+def test_failed_spill_read_returns_copy_put_meanwhile(tmp_path, monkeypatch):
+    store = ContentStore(max_bytes=1, max_disk_bytes=10**6, spill_dir=str(tmp_path))
+    handle = store.put("flashcards", _deck(0))
+    store.put("flashcards", _deck(1))  # spills deck 0
+    assert store.memory_report()["disk_items"] == 1
+
+    real_open = open
+
+    def racing_open(path, *args, **kwargs):
+        # Another session re-puts the deck while this read fails.
+        if str(path).endswith(".json") and args and args[0] == "r":
+            monkeypatch.setattr("builtins.open", real_open)
+            store.put("flashcards", _deck(0))
+            raise OSError("read failed")
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", racing_open)
+    cards = store.get(handle)
+
+    assert cards is not None and cards[0].front == "front 0-0"
+    assert store.memory_report()["misses"] == 0